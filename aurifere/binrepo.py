@@ -0,0 +1,89 @@
+"""Local pacman repository where built packages are published."""
+import logging
+import os
+import subprocess
+import tarfile
+from .lock import FileLock
+
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_desc(content):
+    """Parses the content of a ``desc`` file of a repository database into a
+    dict mapping fields (like ``NAME``) to lists of values."""
+    fields = {}
+    key = None
+    for line in content.splitlines():
+        if line.startswith('%') and line.endswith('%'):
+            key = line.strip('%')
+            fields[key] = []
+        elif line and key:
+            fields[key].append(line)
+    return fields
+
+
+class BinaryRepository:
+    """A directory holding built packages and a pacman database describing
+    them. Other hosts can use it with a section like::
+
+        [aurifere]
+        Server = file:///path/to/dir
+
+    The database is updated incrementally with ``repo-add``, only the newly
+    built packages being added to it."""
+    def __init__(self, dir, name='aurifere'):
+        self.dir = os.path.abspath(dir)
+        self.name = name
+        self.db_path = os.path.join(self.dir, name + '.db.tar.gz')
+        os.makedirs(self.dir, exist_ok=True)
+        # repo-add refuses to run when another instance holds the database,
+        # so concurrent processes wait for each other here
+        self.lock = FileLock(self.db_path + '.aurifere-lock')
+        self._index = None
+
+    def __repr__(self):
+        return '<BinaryRepository("{}")>'.format(self.dir)
+
+    def _load_index(self):
+        """Reads the database and returns a dict mapping package names to a
+        (version, filename) tuple."""
+        index = {}
+        if not os.path.exists(self.db_path):
+            return index
+        with tarfile.open(self.db_path) as db:
+            for member in db:
+                if not member.isfile() or os.path.basename(member.name) != 'desc':
+                    continue
+                desc = _parse_desc(db.extractfile(member).read().decode())
+                index[desc['NAME'][0]] = (desc['VERSION'][0],
+                                          desc['FILENAME'][0])
+        return index
+
+    def index(self):
+        """Returns a dict mapping the packages in the repository to their
+        version and filename. The result is cached."""
+        if self._index is None:
+            self._index = self._load_index()
+        return self._index
+
+    def version(self, pkgname):
+        """Returns the version of the package in the repository, or None."""
+        entry = self.index().get(pkgname)
+        return entry[0] if entry else None
+
+    def files(self, pkgnames):
+        """Returns the paths to the package files for the given packages."""
+        return [os.path.join(self.dir, self.index()[name][1])
+                for name in pkgnames]
+
+    def add(self, files):
+        """Adds the given package files, which must be in the repository
+        directory, to the database. Older versions are removed."""
+        if not files:
+            return
+        logger.debug('Adding %s to %s', files, self)
+        with self.lock:
+            subprocess.check_call(['repo-add', '--quiet', '--remove',
+                                   self.db_path] + list(files))
+        self._index = None
@@ -0,0 +1,67 @@
+"""Persistent caches shared between the aurifere processes."""
+import json
+import sqlite3
+from collections.abc import MutableMapping
+
+
+def connect(path):
+    """Opens the SQLite database at path in WAL mode, where readers don't
+    block the writer, waiting for the other processes writing to it."""
+    db = sqlite3.connect(path, timeout=60)
+    db.execute('PRAGMA journal_mode=WAL')
+    return db
+
+
+class Cache(MutableMapping):
+    """Persistent dict, stored in a SQLite database in WAL mode.
+
+    Each write is committed right away, so several processes can use the
+    same cache at once without overwriting each other's entries. Keys are
+    strings, values are anything that can be serialized to JSON."""
+    def __init__(self, path):
+        self.path = path
+        self._db = connect(path)
+        with self._db:
+            self._db.execute('CREATE TABLE IF NOT EXISTS cache '
+                             '(key TEXT PRIMARY KEY, value TEXT)')
+
+    def __repr__(self):
+        return '<Cache("{}")>'.format(self.path)
+
+    def __getitem__(self, key):
+        row = self._db.execute('SELECT value FROM cache WHERE key = ?',
+                               (key,)).fetchone()
+        if row is None:
+            raise KeyError(key)
+        return json.loads(row[0])
+
+    def __setitem__(self, key, value):
+        self.update({key: value})
+
+    def __delitem__(self, key):
+        with self._db:
+            cursor = self._db.execute('DELETE FROM cache WHERE key = ?',
+                                      (key,))
+        if not cursor.rowcount:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        return self._db.execute('SELECT 1 FROM cache WHERE key = ?',
+                                (key,)).fetchone() is not None
+
+    def __iter__(self):
+        return (key for key, in self._db.execute('SELECT key FROM cache'))
+
+    def __len__(self):
+        return self._db.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+
+    def update(self, items=(), **kw):
+        """Writes all the items in a single transaction."""
+        items = dict(items, **kw)
+        with self._db:
+            self._db.executemany('INSERT OR REPLACE INTO cache VALUES (?, ?)',
+                                 ((key, json.dumps(value))
+                                  for key, value in items.items()))
+
+    def close(self):
+        self._db.close()
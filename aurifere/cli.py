@@ -1,17 +1,24 @@
 """Aurifere
 
 Usage:
-  aurifere [-v] install <package>...
-  aurifere [-v] update
+  aurifere [-v] [--repo=<dir>] install <package>...
+  aurifere [-v] [--repo=<dir>] update [--devel]
+  aurifere [-v] resume
+  aurifere [-v] mirror [<dump>]
 
 Options:
   -h --help     Show this screen.
   -v --verbose
+  --repo=<dir>  Publish the built packages to the pacman repository in <dir>.
+  --devel       Also rebuild the devel packages whose VCS sources moved.
 
 """
 from .vendor.docopt import docopt
 from .vendor import colorama
+from .binrepo import BinaryRepository
 from .install import Install
+from .journal import Journal, JournalMismatchException
+from .providers.aur_mirror import AurMirror, DEFAULT_DUMP_URL
 from .repository import default_repository
 
 
@@ -42,9 +49,12 @@ def review_package(install, package):
         print('This package is required by {}'
         .format(comma_separated_package_list(install.dependencies[package])))
     input('About to show diff ...')
-    package._git._git('diff', 'reviewed', '--color')
+    # The package may be updated by another process during the review, so
+    # we make sure to validate what was shown
+    commit = package._git.ref('master')
+    package._git._git('diff', 'reviewed', commit, '--color')
     if confirm('Validate review for {} '.format(hl(package.name))):
-        package.validate_review()
+        package.validate_review(commit)
     else:
         # TODO : maybe we can be a little more diplomatic
         print("Too bad, I'm gonna crash !")
@@ -94,12 +104,39 @@ def main():
         import logging
         logging.basicConfig(level=logging.DEBUG)
 
-    installer = Install(default_repository())
+    if arguments['mirror']:
+        mirror = AurMirror()
+        added, updated, removed = mirror.import_dump(arguments['<dump>'] or
+                                                     DEFAULT_DUMP_URL)
+        print('AUR mirror updated : {} added, {} updated, {} removed'
+              .format(added, updated, removed))
+        return
+
+    if arguments['resume']:
+        journal = Journal.latest()
+        if not journal:
+            print('Nothing to resume')
+            return
+        try:
+            installer = Install.from_journal(default_repository(), journal)
+        except JournalMismatchException as e:
+            name, _ = e.args
+            print('{} changed since the interrupted run, which cannot be '
+                  'resumed. Run the install again.'.format(hl(name)))
+            return
+        installer.install()
+        return
+
+    binary_repository = None
+    if arguments['--repo']:
+        binary_repository = BinaryRepository(arguments['--repo'])
+
+    installer = Install(default_repository(), binary_repository)
 
     if arguments['install']:
         installer.add_packages(arguments['<package>'])
     if arguments['update']:
-        installer.update_aur()
+        installer.update_aur(devel=arguments['--devel'])
 
     review_and_install(installer)
 
@@ -28,13 +28,13 @@ class Git:
             logger.info('Exception while excuting command in %s', self.dir)
             raise
 
-    def _git(self, *args):
+    def _git(self, *args, **kw):
         """Calls the given git command in the package dir"""
-        self._call(('git',) + args)
+        self._call(('git',) + args, **kw)
 
-    def _git_output(self, *args):
+    def _git_output(self, *args, **kw):
         return (self._call(('git',) + args,
-                          call_function=subprocess.check_output)
+                          call_function=subprocess.check_output, **kw)
                 .decode().strip())
 
     def init(self):
@@ -51,13 +51,26 @@ class Git:
         self._git('add', '-A')
         self._git('commit', '--quiet', '-m', message)
 
-    def tag(self, tag, force=False):
+    def commit_dir(self, branch, dir, message):
+        """Commits the content of dir on top of branch, using a temporary
+        index, so that the working tree is left untouched."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            env = dict(os.environ, GIT_INDEX_FILE=os.path.join(tmpdir, 'index'))
+            self._git('--work-tree', dir, 'add', '-A', env=env)
+            tree = self._git_output('write-tree', env=env)
+        parent = self._git_output('rev-parse', '--verify', branch)
+        commit = self._git_output('commit-tree', tree, '-p', parent,
+                                  '-m', message)
+        self._git('update-ref', 'refs/heads/' + branch, commit, parent)
+        return commit
+
+    def tag(self, tag, force=False, ref='HEAD'):
         # ':' is quite common in version numbers, but not a valid tag
         tag = tag.replace(':', '_')
         if force:
-            self._git('tag', '--force', tag)
+            self._git('tag', '--force', tag, ref)
         else:
-            self._git('tag', tag)
+            self._git('tag', tag, ref)
 
     def status(self, untracked_files='no'):
         return self._git_output('status', '--porcelain',
@@ -75,5 +88,20 @@ class Git:
                 return None
             raise
 
+    def blob(self, ref, path):
+        """Returns the id of the blob at path in ref, or None if there is no
+        such file."""
+        try:
+            return self._git_output('rev-parse', '--verify', '--quiet',
+                                    '{}:{}'.format(ref, path),
+                                    stderr=subprocess.DEVNULL)
+        except subprocess.CalledProcessError:
+            return None
+
+    def read_blob(self, blob):
+        """Returns the content of the given blob, as bytes."""
+        return self._call(('git', 'cat-file', 'blob', blob),
+                          call_function=subprocess.check_output)
+
     def tag_for_ref(self, ref):
         return self._git_output('describe', '--tags', '--exact-match', ref)
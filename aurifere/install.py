@@ -1,30 +1,93 @@
+import logging
 from collections import defaultdict
-from aurifere.providers.aur import NotInAURException, load_aur_cache
+from aurifere.providers.aur import (NotInAURException, load_aur_cache,
+                                    aur_provider)
 from aurifere.pacman import get_foreign_packages
-from .pacman import installed
+from .binrepo import BinaryRepository
+from .journal import Journal, JournalMismatchException, INSTALLED
+from .package import NotReviewedException
+from .pacman import (installed, install_files, mark_as_dependencies,
+                     package_file_name)
 from .repository import PackageNotInRepositoryException
+from .vcs import outdated_packages, probe_packages
+
+
+logger = logging.getLogger(__name__)
+
+
+class MissingPackageFilesException(Exception):
+    """Raised when the build did not produce some of the packages to
+    install."""
+    pass
 
 
 class Install:
-    def __init__(self, repo):
+    def __init__(self, repo, binary_repository=None):
         self.repo = repo
+        self.binary_repository = binary_repository
         self.to_install = []
         self.dependencies = defaultdict(list)
+        # Names of the requested packages built from each package, which are
+        # many when several split packages of a pkgbase are requested
+        self.pkgnames = defaultdict(set)
+        self._dependency_names = set()
         self._pacman_dependencies = defaultdict(list)
+        self.journal = None
+
+    @classmethod
+    def from_journal(cls, repo, journal):
+        """Returns an Install resuming the run recorded in the journal,
+        without resolving nor fetching anything."""
+        binary_repository = None
+        if journal.binary_repository:
+            binary_repository = BinaryRepository(journal.binary_repository)
+        installer = cls(repo, binary_repository)
+        installer.journal = journal
+        for name in journal.plan:
+            pkg = repo.existing_package(name)
+            if pkg._git.ref('master') != journal.commit(name):
+                raise JournalMismatchException(name, journal.commit(name))
+            installer.to_install.append(pkg)
+        return installer
+
+    def _find_package(self, dep):
+        """Returns the package of the repository satisfying dep, which may be
+        an AUR package providing it, and the name of the package to install
+        from it."""
+        try:
+            return self.repo.package(dep), dep
+        except PackageNotInRepositoryException:
+            provider = aur_provider(dep)
+            if not provider or installed(dep):
+                raise
+            return self.repo.package(provider), provider
 
     def _update_deps(self, package):
         for dep in package.pkgbuild().all_depends():
             try:
-                dep_pkg = self.repo.package(dep)
-                self.add_package(dep_pkg, install_before=True)
+                dep_pkg, pkgname = self._find_package(dep)
+                if dep_pkg is package:
+                    # Split package depending on a sibling, which is built
+                    # along with it
+                    if not installed(pkgname):
+                        self.pkgnames[package].add(pkgname)
+                    continue
+                self.add_package(dep_pkg, install_before=True, pkgname=pkgname)
                 self.dependencies[dep_pkg].append(package)
+                self._dependency_names.add(pkgname)
             except PackageNotInRepositoryException:
                 self._pacman_dependencies[package].append(dep)
 
-    def add_package(self, pkg, force=False, install_before=False):
+    def add_package(self, pkg, force=False, install_before=False,
+                    pkgname=None):
+        """Adds the package named pkgname (by default, the package named like
+        pkg) to the packages to install. pkg is the package it is built
+        from."""
         # TODO : fetch package before extracting any information
-        if not force and installed(pkg.name):
+        pkgname = pkgname or pkg.name
+        if not force and installed(pkgname):
             return
+        self.pkgnames[pkg].add(pkgname)
         if not pkg in self.to_install:
             if install_before:
                 self.to_install.insert(0, pkg)
@@ -35,19 +98,27 @@ class Install:
     def add_packages(self, pkgs):
         load_aur_cache(pkgs)
         for pkg in pkgs:
-            self.add_package(self.repo.package(pkg), force=True)
+            self.add_package(self.repo.package(pkg), force=True, pkgname=pkg)
 
-    def update_aur(self):
+    def update_aur(self, devel=False):
+        """Adds the outdated AUR packages. With devel, the devel packages
+        whose VCS sources moved are added too."""
         # TODO report packages not un aur
         pkg_names = get_foreign_packages()
         load_aur_cache(pkg_names)
+        devel_packages = defaultdict(list)
         for pkg_name in pkg_names:
             try:
                 pkg = self.repo.package(pkg_name)
-                if pkg.upgrade_available():
-                    self.add_package(pkg, force=True)
+                if pkg.upgrade_available(pkg_name):
+                    self.add_package(pkg, force=True, pkgname=pkg_name)
+                elif devel and pkg.is_devel():
+                    devel_packages[pkg].append(pkg_name)
             except PackageNotInRepositoryException:
                 continue
+        for pkg in outdated_packages(list(devel_packages)):
+            for pkg_name in devel_packages[pkg]:
+                self.add_package(pkg, force=True, pkgname=pkg_name)
 
     def fetch_all(self):
         for pkg in self.to_install:
@@ -66,9 +137,70 @@ class Install:
         return result
 
     def install(self):
-        to_mark_as_dependencies = [p for p in self.dependencies
-                                   if not installed(p.name)]
+        if not self.journal:
+            to_mark_as_dependencies = [name for name
+                                       in sorted(self._dependency_names)
+                                       if not installed(name)]
+            self.journal = Journal.create(self.to_install,
+                                          {pkg.name: self._outputs(pkg)
+                                           for pkg in self.to_install},
+                                          to_mark_as_dependencies,
+                                          self.binary_repository)
+        journal = self.journal
+        # Devel packages remember the revisions they are built from
+        probe_packages([pkg for pkg in self.to_install
+                        if pkg.vcs_heads is None and pkg.is_devel()])
         for pkg in self.to_install:
-            pkg.build_and_install()
-        for dep in to_mark_as_dependencies:
-            dep.mark_as_dependency()
+            if journal.status(pkg.name) == INSTALLED:
+                continue
+            files = journal.files(pkg.name)
+            if not files:
+                files = self._build(pkg)
+                journal.built(pkg.name, files)
+            install_files(self._select_files(files,
+                                             journal.pkgnames(pkg.name)))
+            journal.installed(pkg.name)
+        if journal.dependencies:
+            mark_as_dependencies(journal.dependencies)
+        journal.finish()
+
+    def _select_files(self, files, pkgnames):
+        """Returns the package files of the packages named in pkgnames."""
+        selected = [f for f in files if package_file_name(f) in pkgnames]
+        missing = set(pkgnames) - {package_file_name(f) for f in selected}
+        if missing:
+            raise MissingPackageFilesException(sorted(missing), files)
+        return selected
+
+    def _outputs(self, pkg):
+        """Returns the names of the packages to install from pkg: the ones
+        that were requested, and the split packages that are already
+        installed, which have to stay in sync with them."""
+        return sorted(self.pkgnames[pkg] |
+                      {name for name in pkg.pkgnames() if installed(name)})
+
+    def _build(self, pkg):
+        """Builds the package once, with all its split packages, and returns
+        the package files."""
+        if not self.binary_repository:
+            files = pkg.build(self.journal.artifacts_dir)
+            pkg.record_vcs_revisions()
+            return files
+
+        # Build into the binary repository, unless it already holds the
+        # reviewed version. The version of a devel package does not tell
+        # which revisions it was built from, so they are always built.
+        repository = self.binary_repository
+        if pkg.review_needed():
+            raise NotReviewedException()
+        if not pkg.is_devel() and all(repository.version(name) == pkg.version()
+                                      for name in pkg.pkgnames()):
+            logger.info('%s %s is already in %s, skipping build',
+                        pkg.name, pkg.version(), repository)
+        else:
+            repository.add(pkg.build(repository.dir))
+            pkg.record_vcs_revisions()
+        # A missing package would be a KeyError here, so it is left to
+        # _select_files to report the ones that are needed
+        return repository.files(name for name in pkg.pkgnames()
+                                if repository.version(name))
@@ -0,0 +1,162 @@
+"""Checkpoint journal of install runs, used to resume interrupted runs."""
+import datetime
+import json
+import logging
+import os
+import shutil
+import tempfile
+from .common import DATA_DIR
+from .lock import FileLock
+
+
+JOURNAL_DIR = os.path.join(DATA_DIR, 'journals')
+logger = logging.getLogger(__name__)
+
+PENDING = 'pending'
+BUILT = 'built'
+INSTALLED = 'installed'
+
+
+class JournalMismatchException(Exception):
+    """Raised when a package changed since the journal was written."""
+    pass
+
+
+class Journal:
+    """Persistent record of an install run.
+
+    It holds the resolved plan (the packages to build, in order, and the
+    split packages to install from each of them), the commit of each package
+    that was fetched and reviewed, and the status of each package. It is
+    saved after each step, so that an interrupted run can be resumed without
+    resolving and fetching again. The built packages are kept in a directory
+    next to the journal until the run is over."""
+    def __init__(self, path, data):
+        self.path = path
+        self.data = data
+        self.artifacts_dir = path[:-len('.json')]
+        # Held by the process running or resuming the run
+        self.lock = FileLock(self.artifacts_dir + '.lock')
+
+    def __repr__(self):
+        return '<Journal("{}")>'.format(self.path)
+
+    @classmethod
+    def create(cls, packages, pkgnames, dependencies, binary_repository=None):
+        """Creates the journal of a new run, building the given packages,
+        installing the packages named in pkgnames (a dict mapping the name of
+        each package to the names of the split packages to install) and
+        marking the packages named in dependencies as dependencies."""
+        os.makedirs(JOURNAL_DIR, exist_ok=True)
+        run_id = '{:%Y%m%d-%H%M%S-%f}-{}'.format(datetime.datetime.now(),
+                                                 os.getpid())
+        data = {
+            'plan': [pkg.name for pkg in packages],
+            'pkgnames': pkgnames,
+            'dependencies': list(dependencies),
+            'commits': {pkg.name: pkg._git.ref('master') for pkg in packages},
+            'status': {pkg.name: PENDING for pkg in packages},
+            'files': {},
+            'binary_repository': (binary_repository.dir
+                                  if binary_repository else None),
+        }
+        journal = cls(os.path.join(JOURNAL_DIR, run_id + '.json'), data)
+        journal.lock.acquire()
+        # The new run supersedes the interrupted ones
+        for path in cls._paths():
+            if path != journal.path:
+                cls(path, None)._drop()
+        os.makedirs(journal.artifacts_dir, exist_ok=True)
+        journal.save()
+        return journal
+
+    @staticmethod
+    def _paths():
+        """Returns the paths of all the journals, from the oldest run to the
+        newest."""
+        if not os.path.isdir(JOURNAL_DIR):
+            return []
+        return sorted(os.path.join(JOURNAL_DIR, f)
+                      for f in os.listdir(JOURNAL_DIR) if f.endswith('.json'))
+
+    @classmethod
+    def latest(cls):
+        """Returns the journal of the last unfinished run, or None. The runs
+        still going on in other processes are skipped, and the returned
+        journal is locked."""
+        for path in reversed(cls._paths()):
+            journal = cls(path, None)
+            if not journal.lock.acquire(blocking=False):
+                continue
+            try:
+                with open(path) as f:
+                    journal.data = json.load(f)
+            except FileNotFoundError:
+                # Finished in the meantime
+                journal.lock.release()
+                continue
+            return journal
+        return None
+
+    def _drop(self):
+        """Deletes the journal of an interrupted run, unless it is still
+        going on in another process."""
+        if not self.lock.acquire(blocking=False):
+            return
+        logger.debug('Dropping %s', self.path)
+        self.finish()
+
+    def save(self):
+        """Writes the journal atomically."""
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path))
+        with os.fdopen(fd, 'w') as f:
+            json.dump(self.data, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    @property
+    def plan(self):
+        return self.data['plan']
+
+    @property
+    def dependencies(self):
+        return self.data['dependencies']
+
+    @property
+    def binary_repository(self):
+        return self.data['binary_repository']
+
+    def commit(self, name):
+        """Returns the commit of the package that was reviewed for this run."""
+        return self.data['commits'][name]
+
+    def pkgnames(self, name):
+        """Returns the names of the packages to install from the package."""
+        return self.data['pkgnames'][name]
+
+    def status(self, name):
+        return self.data['status'][name]
+
+    def files(self, name):
+        """Returns the package files built for the package, or None if they
+        are missing."""
+        files = self.data['files'].get(name)
+        if files and all(os.path.exists(f) for f in files):
+            return files
+        return None
+
+    def built(self, name, files):
+        self.data['status'][name] = BUILT
+        self.data['files'][name] = files
+        self.save()
+
+    def installed(self, name):
+        self.data['status'][name] = INSTALLED
+        self.save()
+
+    def finish(self):
+        """Deletes the journal and the built packages once the run is over."""
+        logger.debug('Run recorded in %s is over', self.path)
+        shutil.rmtree(self.artifacts_dir, ignore_errors=True)
+        os.remove(self.path)
+        os.remove(self.lock.path)
+        self.lock.release()
@@ -0,0 +1,57 @@
+"""Locks shared between the aurifere processes."""
+import fcntl
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+
+class FileLock:
+    """Exclusive lock on a file, shared between processes.
+
+    The lock is reentrant within a process, so that a method holding it can
+    call other methods that take it too. It is released when the process
+    dies, so a crash never leaves a stale lock behind."""
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+        self._depth = 0
+
+    def __repr__(self):
+        return '<FileLock("{}")>'.format(self.path)
+
+    def acquire(self, blocking=True):
+        """Takes the lock, waiting for other processes to release it. Without
+        blocking, returns False instead of waiting."""
+        if not self._depth:
+            f = open(self.path, 'a')
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                if not blocking:
+                    f.close()
+                    return False
+                logger.info('Waiting for another process to release %s',
+                            self.path)
+                try:
+                    fcntl.flock(f, fcntl.LOCK_EX)
+                except BaseException:
+                    f.close()
+                    raise
+            self._file = f
+        self._depth += 1
+        return True
+
+    def release(self):
+        self._depth -= 1
+        if not self._depth:
+            # Closing the file releases the lock
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
@@ -1,10 +1,13 @@
 import logging
 import os
 import subprocess
+import tempfile
 from aurifere.pacman import installed
 from aurifere.pkgbuild import version_is_greater
 from aurifere.git import Git
+from aurifere.lock import FileLock
 from aurifere.pkgbuild import PKGBUILD
+from aurifere.vcs import parse_source, DEVEL_SUFFIXES
 
 
 logger = logging.getLogger(__name__)
@@ -22,93 +25,162 @@ class NotReviewedException(Exception):
     pass
 
 
+def _package_files(dir):
+    """Returns a dict mapping the package files in dir to their mtime."""
+    return {entry.path: entry.stat().st_mtime_ns
+            for entry in os.scandir(dir)
+            if '.pkg.tar' in entry.name and not entry.name.endswith('.sig')}
+
+
 class Package:
     def __init__(self, name, repository, provider_class=lambda *_: None):
         self.name = name
         self._repository = repository
         self.dir = os.path.join(repository.dir, name)
         self._git = Git(self.dir)
-        self._pkgbuild = None
+        self._pkgbuilds = {}
+        self.vcs_heads = None
         self.provider = provider_class(self.name, self.dir)
-
-        if not os.path.exists(self.dir):
-            self._git.init()
-            self._git._git('branch', 'upstream')
-            self._git.tag('reviewed')
-            self._git.tag('empty')
-
+        # Held while the package's git repository or working tree are
+        # modified, so that other processes can work on other packages
+        self.lock = FileLock(os.path.join(repository.locks_dir,
+                                          name + '.lock'))
+
+        if (not os.path.exists(self.dir) or
+                not self._git.blob('master', 'PKGBUILD')):
+            # First import of the package
+            with self.lock:
+                if not os.path.exists(self.dir):
+                    self._git.init()
+                    self._git._git('branch', 'upstream')
+                    self._git.tag('reviewed')
+                    self._git.tag('empty')
+                self._check_clean()
+                if not self._git.blob('master', 'PKGBUILD'):
+                    self.update_from_upstream()
+                    self.apply_modifications()
+        elif self.lock.acquire(blocking=False):
+            # When the lock is held, another process is working on the
+            # package, like building it, so the working dir is not clean but
+            # there's nothing to worry about. Opening the package must not
+            # wait for it.
+            try:
+                self._check_clean()
+            finally:
+                self.lock.release()
+
+    def _check_clean(self):
         # To avoid losing anything, we refuse to work on unclean working dir
         modified_files = self._git.status()
         if modified_files:
             raise WorkingDirNotCleanException(self.name, modified_files)
 
-        if not os.path.exists(os.path.join(self.dir, "PKGBUILD")):
-            self.update_from_upstream()
-            self.apply_modifications()
-
     def __repr__(self):
         return '<{}("{}")>'.format(type(self).__name__, self.name)
 
-    def pkgbuild(self):
-        """Returns a PKGBUILD object for this package."""
-        # TODO change the way the cache is handled, because of the multiple branches
-        if not self._pkgbuild:
-            pkgbuild_path = os.path.join(self.dir, 'PKGBUILD')
-            if not os.path.exists(pkgbuild_path):
-                raise NoPKGBUILDException(self.name, pkgbuild_path)
-            self._pkgbuild = PKGBUILD(pkgbuild_path)
-        return self._pkgbuild
-
-    def version(self):
+    def pkgbuild(self, ref='master'):
+        """Returns a PKGBUILD object for this package, as it is in ref. The
+        file is read from the git objects, so the working tree is not used."""
+        blob = self._git.blob(ref, 'PKGBUILD')
+        if not blob:
+            raise NoPKGBUILDException(self.name, ref)
+        if blob not in self._pkgbuilds:
+            self._pkgbuilds[blob] = PKGBUILD.from_content(
+                self._git.read_blob(blob))
+        return self._pkgbuilds[blob]
+
+    def version(self, ref='master'):
         """Returns the version of the package in the repository."""
-        return self.pkgbuild().version()
+        return self.pkgbuild(ref).version()
+
+    def pkgnames(self):
+        """Returns the names of the packages built from this package, which
+        are many for split packages."""
+        return self.pkgbuild().names()
 
-    def upgrade_available(self):
+    def upgrade_available(self, pkgname=None):
         """Returns true if there's a more recent version than the one
-        installed."""
+        installed, for the given package built from this one (the package
+        named like this one by default)."""
         if not self.provider:
             return False  # If there's no upstream, then there's no update
-        pkg = installed(self.name)
+        pkg = installed(pkgname or self.name)
         upstream_version = self.provider.upstream_version()
         return (pkg and upstream_version and
                 version_is_greater(upstream_version, pkg.version))
 
+    def vcs_sources(self):
+        """Returns the sources of the package that come from a VCS."""
+        sources = (parse_source(s) for s in self.pkgbuild()['source'])
+        return [s for s in sources if s]
+
+    def is_devel(self):
+        """Returns true if the package is built from VCS sources."""
+        return self.name.endswith(DEVEL_SUFFIXES) or bool(self.vcs_sources())
+
+    def vcs_outdated(self):
+        """Returns true if the VCS sources moved since the last build. The
+        sources must have been probed.
+
+        When the revisions of the last build are unknown, like for packages
+        installed before, the installed package is assumed to be up to date
+        and the probed revisions are recorded."""
+        if not self.vcs_heads:
+            return False
+        built = self._repository.vcs_db.get(self.name)
+        if built is None:
+            logger.info('Assuming %s is built from the current revisions',
+                        self.name)
+            self.record_vcs_revisions()
+            return False
+        return any(built.get(key) != revision
+                   for key, revision in self.vcs_heads.items())
+
+    def record_vcs_revisions(self):
+        """Remembers the probed revisions of the VCS sources as the ones the
+        package was built from."""
+        if self.vcs_heads:
+            self._repository.vcs_db[self.name] = self.vcs_heads
+
     def update_from_upstream(self):
         if not self.provider:
             return False  # No upstream, no chocolate
 
-        self._git.switch_branch('upstream')
-        try:
-            version = self.version()
-        except NoPKGBUILDException:
-            version = None
-        new_version = self.provider.upstream_version()
+        with self.lock:
+            try:
+                version = self.version('upstream')
+            except NoPKGBUILDException:
+                version = None
+            new_version = self.provider.upstream_version()
 
-        if not version or version != new_version:
-            self.provider.fetch_upstream()
-            self._pkgbuild = None
-            self._git.commit_all(new_version)
-            self._git.tag(new_version)
-        self._git.switch_branch('master')
+            if not version or version != new_version:
+                # The upstream snapshot is committed without checking it out
+                with tempfile.TemporaryDirectory() as tmpdir:
+                    self.provider.fetch_upstream(tmpdir)
+                    self._git.commit_dir('upstream', tmpdir, new_version)
+                self._git.tag(new_version, ref='upstream')
 
     def apply_modifications(self):
         # TODO merge modifications
-        self._git._git('reset', '--hard', 'upstream', '--quiet')
+        with self.lock:
+            self._git._git('reset', '--hard', 'upstream', '--quiet')
 
     def review_needed(self):
-        if self._git.ref('reviewed') != self._git.ref('master'):
-            if self.trivial_diff():
+        master = self._git.ref('master')
+        if self._git.ref('reviewed') != master:
+            if self.trivial_diff(master):
                 logger.info('Validating trivial review for %s', self.name)
-                self.validate_review()
+                self.validate_review(master)
                 return False
             else:
                 return True
         else:
             return False
 
-    def trivial_diff(self):
-        """Returns true is the diff is trivial (only pkgver and sums changed)"""
-        diff = self._git._git_output('diff', 'reviewed')
+    def trivial_diff(self, commit):
+        """Returns true is the diff between the reviewed version and commit
+        is trivial (only pkgver and sums changed)"""
+        diff = self._git._git_output('diff', 'reviewed', commit)
         for line in diff.splitlines():
             if line.startswith(('-', '+')):
                 if not line.startswith(('--', '++', 'pkgver', 'md5sums', 'sha256sums', 'sha512sums', 'sha1sums'), 1):
@@ -116,28 +188,43 @@ class Package:
                     return False
         return True
 
-    def validate_review(self):
-        self._git.tag('reviewed', force=True)
+    def validate_review(self, commit):
+        """Marks commit, the one whose diff was reviewed, as reviewed. Another
+        process may have fetched a newer commit since, which is left to
+        review."""
+        with self.lock:
+            self._git.tag('reviewed', force=True, ref=commit)
 
     # TODO : methods to help the review
 
-    def build_and_install(self):
-        if self.review_needed():
-            raise NotReviewedException()
-
-        try:
-            subprocess.check_call(['makepkg', '--clean', '--syncdeps', '--install',
-                               '--noconfirm'],
-            cwd=self.dir)
-        finally:
-            self._git.clean()
-
-            if self._git.status():
-                logger.warn('Package %s had to be cleaned after build. '+
-                    'This is probably a devel package. This will be handled'+
-                    'in a future version', self.name)
-                self._git._git('reset', '--hard', '--quiet')
-
-    def mark_as_dependency(self):
-        subprocess.check_call(['sudo', 'pacman', '--database', '--asdeps',
-                               self.name])
+    def _makepkg(self, *args, env=None):
+        with self.lock:
+            if self.review_needed():
+                raise NotReviewedException()
+
+            try:
+                subprocess.check_call(['makepkg', '--clean', '--syncdeps',
+                                       '--noconfirm'] + list(args),
+                cwd=self.dir, env=env)
+            finally:
+                self._git.clean()
+
+                if self._git.status():
+                    logger.warn('Package %s had to be cleaned after build. '+
+                        'This is probably a devel package. This will be handled'+
+                        'in a future version', self.name)
+                    self._git._git('reset', '--hard', '--quiet')
+
+    def build(self, pkgdest):
+        """Builds the package without installing it, and returns the paths to
+        the package files, written in pkgdest."""
+        pkgdest = os.path.abspath(pkgdest)
+        before = _package_files(pkgdest)
+        # pkgdest may already hold a package with the same version, like a
+        # devel package rebuilt while upstream did not move, and makepkg
+        # refuses to overwrite it without --force
+        self._makepkg('--force', env=dict(os.environ, PKGDEST=pkgdest))
+        # --packagelist can't be trusted with devel packages, whose version
+        # is only known after the build, so we look at what was written
+        return sorted(path for path, mtime in _package_files(pkgdest).items()
+                      if before.get(path) != mtime)
@@ -1,4 +1,6 @@
 """Interface to pacman."""
+import os
+import subprocess
 import pyalpm
 import pycman.config
 
@@ -41,3 +43,22 @@ def get_satisfier_in_syncdb(pkg):
 
 def installed(pkg):
     return pyalpm.find_satisfier(db.pkgcache, pkg)
+
+
+def install_files(files):
+    """Installs the given package files."""
+    subprocess.check_call(['sudo', 'pacman', '--upgrade', '--noconfirm'] +
+                          list(files))
+
+
+def mark_as_dependencies(pkgs):
+    """Marks the given installed packages as installed as dependencies."""
+    subprocess.check_call(['sudo', 'pacman', '--database', '--asdeps'] +
+                          list(pkgs))
+
+
+def package_file_name(path):
+    """Returns the name of the package in the given package file."""
+    filename = os.path.basename(path).split('.pkg.tar')[0]
+    # The file name is name-pkgver-pkgrel-arch
+    return filename.rsplit('-', 3)[0]
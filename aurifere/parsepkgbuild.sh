@@ -40,6 +40,8 @@ print_array()
 
 echo "{"
 print_var   name        "\$pkgname"
+print_array names       "\${pkgname[@]}"
+print_var   base        "\$pkgbase"
 print_var   version     "\$pkgver"
 print_var   release     "\$pkgrel"
 print_var   epoch       "\$epoch"
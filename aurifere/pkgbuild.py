@@ -1,48 +1,77 @@
 """PKGBUILD parsing"""
 import hashlib
 import os
-import shelve
 import subprocess
+import tempfile
 import ast
 import logging
 import itertools
-import atexit
 import pyalpm
+from aurifere.cache import Cache
 from aurifere.common import DATA_DIR
 
 
 logger = logging.getLogger(__name__)
 
+# To bump when the output of parsepkgbuild.sh changes, to invalidate the cache
+_PARSER_VERSION = 2
+_pkgbuild_cache = None
 
-_pkgbuild_cache = shelve.open(os.path.join(DATA_DIR, 'pkgbuild_cache.db'))
-atexit.register(_pkgbuild_cache.close)
+
+def _get_pkgbuild_cache():
+    """Returns the cache of parsed PKGBUILDs, opening it if needed."""
+    global _pkgbuild_cache
+    if _pkgbuild_cache is None:
+        _pkgbuild_cache = Cache(os.path.join(DATA_DIR, 'pkgbuild_cache.sqlite'))
+    return _pkgbuild_cache
 
 
 class PKGBUILD:
     """PKGBUILD parser."""
     def __init__(self, path):
         self.path = path
-        self._parse()
-
-    def _parse(self):
-        """Parses the PKGBUILD file."""
+        with open(path, 'rb') as f:
+            self._parse(f.read(), os.path.dirname(path),
+                        os.path.basename(path))
+
+    @classmethod
+    def from_content(cls, content):
+        """Returns a PKGBUILD object for the given content (as bytes) of a
+        PKGBUILD file."""
+        pkgbuild = cls.__new__(cls)
+        pkgbuild.path = None
+        pkgbuild._parse(content)
+        return pkgbuild
+
+    def _parse(self, content, dir=None, filename='PKGBUILD'):
+        """Parses the PKGBUILD content, which is the one of the file named
+        filename in dir, or of no file if dir is None, in which case the
+        parsing is done in a temporary directory."""
         # Parsing code stolen and adapted from https://github.com/sebnow/aur2/
 
-        h = hashlib.md5(open(self.path, 'rb').read()).hexdigest()
-        if h in _pkgbuild_cache:
-            self.content = _pkgbuild_cache[h]
+        h = '{}-{}'.format(_PARSER_VERSION, hashlib.md5(content).hexdigest())
+        cached = _get_pkgbuild_cache().get(h)
+        if cached is not None:
+            self.content = cached
+            return
+
+        if dir is None:
+            with tempfile.TemporaryDirectory() as tmpdir:
+                with open(os.path.join(tmpdir, 'PKGBUILD'), 'wb') as f:
+                    f.write(content)
+                self._parse(content, tmpdir)
             return
 
-        logger.debug('Parsing %s', self.path)
+        logger.debug('Parsing %s', self.path or 'PKGBUILD')
         script_dir = os.path.abspath(os.path.dirname(__file__))
         output = subprocess.check_output([os.path.join(script_dir,
                                                        'parsepkgbuild.sh'),
-                                          'PKGBUILD'],
-            cwd=os.path.dirname(self.path))
+                                          filename],
+            cwd=dir)
 
         self.content = ast.literal_eval(output.decode())
 
-        _pkgbuild_cache[h] = self.content
+        _get_pkgbuild_cache()[h] = self.content
 
     def __getitem__(self, key):
         return self.content.__getitem__(key)
@@ -54,6 +83,15 @@ class PKGBUILD:
             v = '{}:{}'.format(self['epoch'], v)
         return v
 
+    def names(self):
+        """Returns the names of the packages built by the PKGBUILD, which are
+        many for split packages."""
+        return self['names']
+
+    def base(self):
+        """Returns the pkgbase of the PKGBUILD."""
+        return self['base'] or self['name']
+
     def all_depends(self):
         """Returns a list of all the packages needed to build the PKGBUILD."""
         # TODO : sale
@@ -1,3 +1,4 @@
 
-# A provider has a constructor that takes a name and a dir, a upstream_version method, and a fetch_upstream_method
+# A provider has a constructor that takes a name and a dir, a upstream_version method, and a fetch_upstream method
+# that writes the upstream files in the given directory
 # TODO: document this with an abc when I make another provider
@@ -1,4 +1,5 @@
 import logging
+import re
 import tempfile
 import urllib.request
 import tarfile
@@ -7,12 +8,14 @@ import os.path
 import shutil
 import atexit
 from aurifere.vendor import AUR
+from aurifere.cache import Cache
 from aurifere.common import DATA_DIR
 from aurifere.pacman import get_satisfier_in_syncdb
 from aurifere.package import NoPKGBUILDException
+from aurifere.providers.aur_mirror import AurMirror, MIRROR_FILENAME
 
 
-NOT_IN_AUR_FILENAME = os.path.join(DATA_DIR, 'not_in_aur')
+NOT_IN_AUR_FILENAME = os.path.join(DATA_DIR, 'not_in_aur.sqlite')
 logger = logging.getLogger(__name__)
 
 
@@ -26,15 +29,12 @@ class _LoggingAUR(AUR.AUR):
 
     def __init__(self):
         super().__init__()
-        if os.path.exists(NOT_IN_AUR_FILENAME):
-            with open(NOT_IN_AUR_FILENAME) as f:
-                self.not_in_aur = set(f.read().split())
-        else:
-            self.not_in_aur = set()
+        # Written as soon as a package is found missing, so that concurrent
+        # processes don't overwrite each other's findings
+        self.not_in_aur = Cache(NOT_IN_AUR_FILENAME)
 
     def close_cache(self):
-        with open(NOT_IN_AUR_FILENAME, 'w') as f:
-            f.write('\n'.join(self.not_in_aur))
+        self.not_in_aur.close()
 
     def info(self, pkgs):
         if isinstance(pkgs, str):
@@ -46,16 +46,39 @@ class _LoggingAUR(AUR.AUR):
             for r in result:
                 pkgs.remove(r['Name'])
 
-        self.not_in_aur.update(pkgs)
+        self.not_in_aur.update(dict.fromkeys(pkgs, True))
         return result
 
 
 _aur_object = None
+_aur_mirror = None
+# AUR information of the pkgbases seen by aur_pkgbase, needed because a
+# pkgbase is not always the name of one of its packages
+_pkgbase_info = {}
+
+
+def aur_mirror():
+    """Returns the local AUR mirror, or None if no dump was imported. The
+    mirror is looked up once, when it is first needed."""
+    global _aur_mirror
+    if _aur_mirror is None:
+        _aur_mirror = False
+        if os.path.exists(MIRROR_FILENAME):
+            mirror = AurMirror(MIRROR_FILENAME)
+            atexit.register(mirror.close)
+            if not mirror.empty():
+                _aur_mirror = mirror
+    return _aur_mirror or None
 
 
 def aur_info(pkgs):
     """Return the AUR information for given packages.
-    Initialize the AUR.AUR object if needed."""
+    The local mirror is used if there is one, otherwise the AUR.AUR object is
+    initialized if needed."""
+    mirror = aur_mirror()
+    if mirror:
+        return mirror.info(pkgs)
+
     global _aur_object
     if not _aur_object:
         _aur_object = _LoggingAUR()
@@ -68,22 +91,54 @@ def load_aur_cache(pkgs):
     aur_info(pkgs)
 
 
+def aur_provider(dep):
+    """Returns the name of an AUR package providing dep, when dep is not
+    satisfied by a sync package. Only available with the local mirror."""
+    mirror = aur_mirror()
+    if not mirror or get_satisfier_in_syncdb(dep):
+        return None
+    providers = mirror.providers(dep)
+    return providers[0] if providers else None
+
+
+def aur_pkgbase(name):
+    """Returns the pkgbase of the AUR package, or None if the package is not
+    in AUR."""
+    if get_satisfier_in_syncdb(name):
+        return None
+    aur_info_result = aur_info(name)
+    if not aur_info_result:
+        return None
+    info = aur_info_result[0]
+    pkgbase = info.get('PackageBase')
+    if not pkgbase:
+        # The cache of AUR.AUR does not keep the PackageBase, but the tarball
+        # is named after it
+        pkgbase = re.sub(r'\.tar\.\w+$', '',
+                         os.path.basename(info['URLPath']))
+    _pkgbase_info[pkgbase] = info
+    return pkgbase
+
+
 class NotInAURException(Exception):
     """Raised when the given package is not in AUR."""
     pass
 
 
 class AurProvider:
-    """Represents an AUR package and handles the download."""
+    """Represents an AUR pkgbase and handles the download."""
     def __init__(self, name, dir):
         if get_satisfier_in_syncdb(name):
             # package in the syncdb, so not in AUR
             raise NotInAURException(name)
 
         aur_info_result = aur_info(name)
-        if not aur_info_result:
+        if aur_info_result:
+            self.aur_info = aur_info_result[0]
+        elif name in _pkgbase_info:
+            self.aur_info = _pkgbase_info[name]
+        else:
             raise NotInAURException(name)
-        self.aur_info = aur_info_result[0]
         self.name = name
         self.dir = dir
 
@@ -91,8 +146,9 @@ class AurProvider:
         """Returns the version of the package in AUR."""
         return self.aur_info['Version']
 
-    def _download(self):
-        """Downloads and extract the last version of the package from AUR."""
+    def _download(self, dir):
+        """Downloads and extract the last version of the package from AUR
+        into dir."""
         logger.debug("Downloading package %s", self.name)
         url = self.aur_info['URLPath']
 
@@ -100,37 +156,19 @@ class AurProvider:
             + url)
 
         with tarfile.open(tarfilename) as tar:
-            if self.name not in tar.getnames():
-                # Probably a split package, like python2-prettytable
-                # The tar does not have the usual form, so we extract is somewhere
-                # else, then copy the content to the right directory
-                with tempfile.TemporaryDirectory() as tmpdir:
-                    tar.extractall(tmpdir)
-                    tardirs = os.listdir(tmpdir)
-                    assert len(tardirs) == 1, 'The tar contained more than one directory'
-                    tmppkgdir = os.path.join(tmpdir, tardirs[0])
-                    shutil.move(os.path.join(self.dir, '.git'),
-                                tmppkgdir)
-                    shutil.rmtree(self.dir)
-                    shutil.move(tmppkgdir, self.dir)
-            else:
-                # Extract to the parent dir because the tar contains a
-                # dir with the right name
-                tar.extractall(os.path.dirname(self.dir))
-
-    def _purge(self):
-        """Deletes all files and dirs except .git"""
-        files_to_delete = os.listdir(self.dir)
-        files_to_delete.remove('.git')
-        for filename in files_to_delete:
-            filename = os.path.join(self.dir, filename)
-            if os.path.isfile(filename):
-                os.remove(filename)
-            else:
-                shutil.rmtree(filename)
-
-    def fetch_upstream(self):
-        """Updates the package."""
-        self._purge()
-        self._download()
-        self._pkgbuild = None  # Invalidate the cache
+            # The tar contains a single directory, usually named after the
+            # package, but not always, like for split packages such as
+            # python2-prettytable. We extract it somewhere else, then move
+            # its content to the right directory.
+            with tempfile.TemporaryDirectory() as tmpdir:
+                tar.extractall(tmpdir)
+                tardirs = os.listdir(tmpdir)
+                assert len(tardirs) == 1, 'The tar contained more than one directory'
+                tmppkgdir = os.path.join(tmpdir, tardirs[0])
+                for filename in os.listdir(tmppkgdir):
+                    shutil.move(os.path.join(tmppkgdir, filename), dir)
+
+    def fetch_upstream(self, dir):
+        """Writes the last version of the package in dir, which should be
+        empty."""
+        self._download(dir)
@@ -0,0 +1,118 @@
+"""Local mirror of the AUR metadata, imported from a bulk dump.
+
+Once imported, the mirror answers the AUR queries without any network
+access. It is refreshed by importing a newer dump, only the packages that
+changed being written."""
+import gzip
+import json
+import logging
+import os
+import re
+import urllib.request
+from aurifere.cache import connect
+from aurifere.common import DATA_DIR
+
+
+MIRROR_FILENAME = os.path.join(DATA_DIR, 'aur_mirror.sqlite')
+DEFAULT_DUMP_URL = 'https://aur.archlinux.org/packages-meta-ext-v1.json.gz'
+logger = logging.getLogger(__name__)
+
+
+def _read_dump(source):
+    """Returns the list of packages in the dump, which can be a local file or
+    an URL, gzipped or not."""
+    if '://' in source:
+        logger.debug('Downloading %s', source)
+        with urllib.request.urlopen(source) as response:
+            data = response.read()
+    else:
+        with open(source, 'rb') as f:
+            data = f.read()
+    if data[:2] == b'\x1f\x8b':
+        data = gzip.decompress(data)
+    return json.loads(data.decode())
+
+
+def _provided_names(pkg):
+    """Returns the names provided by the package, without versions."""
+    return {re.split('[<>=]', provide)[0]
+            for provide in pkg.get('Provides') or ()}
+
+
+class AurMirror:
+    """AUR metadata stored in an indexed SQLite database."""
+    def __init__(self, path=MIRROR_FILENAME):
+        self.path = path
+        self._db = connect(path)
+        with self._db:
+            self._db.execute('CREATE TABLE IF NOT EXISTS packages '
+                             '(name TEXT PRIMARY KEY, version TEXT, '
+                             'pkgbase TEXT, info TEXT)')
+            self._db.execute('CREATE TABLE IF NOT EXISTS provides '
+                             '(provide TEXT, name TEXT)')
+            self._db.execute('CREATE INDEX IF NOT EXISTS provides_provide '
+                             'ON provides (provide)')
+            self._db.execute('CREATE INDEX IF NOT EXISTS provides_name '
+                             'ON provides (name)')
+
+    def __repr__(self):
+        return '<AurMirror("{}")>'.format(self.path)
+
+    def __len__(self):
+        return self._db.execute('SELECT COUNT(*) FROM packages').fetchone()[0]
+
+    def empty(self):
+        """Returns true if no dump was imported, without counting the
+        packages."""
+        return self._db.execute('SELECT 1 FROM packages LIMIT 1'
+                                ).fetchone() is None
+
+    def info(self, pkgs):
+        """Returns the AUR information for the given packages, in the format
+        of the AUR RPC interface."""
+        if isinstance(pkgs, str):
+            pkgs = [pkgs]
+        result = []
+        for pkg in set(pkgs):
+            row = self._db.execute('SELECT info FROM packages WHERE name = ?',
+                                   (pkg,)).fetchone()
+            if row:
+                result.append(json.loads(row[0]))
+        return result
+
+    def providers(self, dep):
+        """Returns the names of the packages providing dep."""
+        return sorted(name for name, in self._db.execute(
+            'SELECT name FROM provides WHERE provide = ?', (dep,)))
+
+    def import_dump(self, source=DEFAULT_DUMP_URL):
+        """Imports the dump, and returns the number of packages that were
+        added, updated and removed since the previous import."""
+        current = dict(self._db.execute('SELECT name, info FROM packages'))
+        new = {pkg['Name']: json.dumps(pkg, sort_keys=True)
+               for pkg in _read_dump(source)}
+
+        changed = {name: info for name, info in new.items()
+                   if current.get(name) != info}
+        removed = current.keys() - new.keys()
+        added = len(changed.keys() - current.keys())
+
+        with self._db:
+            self._db.executemany('DELETE FROM provides WHERE name = ?',
+                                 ((name,) for name in removed | changed.keys()))
+            self._db.executemany('DELETE FROM packages WHERE name = ?',
+                                 ((name,) for name in removed))
+            for name, info in changed.items():
+                pkg = json.loads(info)
+                self._db.execute('INSERT OR REPLACE INTO packages '
+                                 'VALUES (?, ?, ?, ?)',
+                                 (name, pkg['Version'],
+                                  pkg.get('PackageBase', name), info))
+                self._db.executemany('INSERT INTO provides VALUES (?, ?)',
+                                     ((provide, name) for provide
+                                      in _provided_names(pkg)))
+        logger.debug('Imported %s into %s', source, self)
+        return added, len(changed) - added, len(removed)
+
+    def close(self):
+        self._db.close()
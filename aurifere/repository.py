@@ -1,9 +1,12 @@
+import dbm
 import os
 import logging
 import shelve
+from .cache import Cache
 from .common import DATA_DIR
-from .package import Package
-from .providers.aur import AurProvider, NotInAURException
+from .lock import FileLock
+from .package import Package, NoPKGBUILDException
+from .providers.aur import AurProvider, NotInAURException, aur_pkgbase
 
 logger = logging.getLogger(__name__)
 
@@ -15,47 +18,118 @@ class PackageNotInRepositoryException(Exception):
 class Repository:
     def __init__(self, dir):
         self.dir = dir
-        os.makedirs(self.dir, exist_ok=True)
+        self.locks_dir = os.path.join(self.dir, '.locks')
+        os.makedirs(self.locks_dir, exist_ok=True)
 
         self._open_packages = {}
-        self.db = shelve.open(os.path.join(self.dir, 'types.db'))
+        self.db = Cache(os.path.join(self.dir, 'types.sqlite'))
+        self._import_shelve(os.path.join(self.dir, 'types.db'))
+        # Revisions of the VCS sources devel packages were last built from
+        self.vcs_db = Cache(os.path.join(self.dir, 'vcs.sqlite'))
 
     def __del__(self):
         self.db.close()
+        self.vcs_db.close()
 
     def __repr__(self):
         return '<Repository("{}")>'.format(self.dir)
 
+    def _import_shelve(self, path):
+        """Imports the package types from the shelve used by older
+        versions."""
+        if self.db or not dbm.whichdb(path):
+            return
+        logger.debug('Importing package types from %s', path)
+        with shelve.open(path, 'r') as old_db:
+            self.db.update(old_db)
+
     def package(self, name, type="default"):
+        """Returns the package building name. The packages built from the same
+        PKGBUILD (split packages) share the package of their pkgbase."""
+        if name not in self._open_packages:
+            pkgbase = name
+            if self.db.get(name, type) != "manual":
+                pkgbase = aur_pkgbase(name) or name
+            if pkgbase not in self._open_packages:
+                self._open_packages[pkgbase] = self._open_package(pkgbase,
+                                                                  name, type)
+            self._open_packages[name] = self._open_packages[pkgbase]
+        return self._open_packages[name]
+
+    def _lock(self, name):
+        """Returns the lock of the package, the one held by Package."""
+        return FileLock(os.path.join(self.locks_dir, name + '.lock'))
+
+    def _move_to_pkgbase(self, name, pkgbase):
+        """Renames the package directory of name, created by older versions,
+        after its pkgbase."""
+        if name == pkgbase:
+            return
+        old_dir = os.path.join(self.dir, name)
+        new_dir = os.path.join(self.dir, pkgbase)
+        with self._lock(name), self._lock(pkgbase):
+            if os.path.isdir(old_dir) and not os.path.exists(new_dir):
+                logger.info('Moving %s to %s', old_dir, new_dir)
+                os.rename(old_dir, new_dir)
+                self.db[pkgbase] = self.db.get(name, "default")
+
+    def _forget_siblings(self, package):
+        """Forgets the split packages built from package that older versions
+        kept as packages of their own."""
+        try:
+            pkgnames = package.pkgnames()
+        except NoPKGBUILDException:
+            return
+        for sibling in pkgnames:
+            if (sibling == package.name or
+                    self.db.get(sibling, "manual") == "manual"):
+                continue
+            del self.db[sibling]
+            sibling_dir = os.path.join(self.dir, sibling)
+            if os.path.isdir(sibling_dir):
+                logger.warning('Package %s is now built from %s, and the '
+                               'folder %s is not used any more. You may '
+                               'want to delete it.',
+                               sibling, package.name, sibling_dir)
+
+    def _open_package(self, pkgbase, name, type):
         # TODO: add a proper provider for manual
+        self._move_to_pkgbase(name, pkgbase)
+        if pkgbase in self.db:
+            type = self.db[pkgbase]
+        if type == "aur":
+            try:
+                package = Package(pkgbase, self, AurProvider)
+            except NotInAURException:
+                package = Package(pkgbase, self)
+                logger.warn('Package %s used to be in AUR but is not any '
+                            'more. You may want to find an alternative. '
+                            'To remove this message, delete the folder %s .'
+                    %(pkgbase, package.dir))
+        elif type == "manual":
+            package = Package(pkgbase, self)
+        elif type == "default":
+            try:
+                package = Package(pkgbase, self, AurProvider)
+                type = "aur"
+            except NotInAURException as e:
+                raise PackageNotInRepositoryException() from e
+        else:
+            raise ValueError("Unsupported value for argument type",
+                             type)
+        logger.debug('Adding %s of type %s to the repository', pkgbase, type)
+        self.db[pkgbase] = type
+        self._forget_siblings(package)
+        return package
+
+    def existing_package(self, name):
+        """Opens a package already in the repository, without looking for it
+        upstream."""
         if name not in self._open_packages:
-            if name in self.db:
-                type = self.db[name]
-            if type == "aur":
-                try:
-                    package = Package(name, self, AurProvider)
-                except NotInAURException:
-                    package = Package(name, self)
-                    logger.warn('Package %s used to be in AUR but is not any '
-                                'more. You may want to find an alternative. '
-                                'To remove this message, delete the folder %s .'
-                        %(name, package.dir))
-            elif type == "manual":
-                package = Package(name, self)
-            elif type == "default":
-                try:
-                    package = Package(name, self, AurProvider)
-                    type = "aur"
-                except NotInAURException as e:
-                    raise PackageNotInRepositoryException() from e
-            else:
-                raise ValueError("Unsupported value for argument type",
-                                 type)
-            logger.debug('Adding %s of type %s to the repository', name, type)
-            self.db[name] = type
-            self._open_packages[name] = package
+            if not os.path.isdir(os.path.join(self.dir, name)):
+                raise PackageNotInRepositoryException(name)
+            self._open_packages[name] = Package(name, self)
         return self._open_packages[name]
-#TODO : treat dev packages separately
 
 def default_repository():
     return Repository(DATA_DIR)
@@ -0,0 +1,124 @@
+"""Freshness checks for devel packages, built from VCS sources."""
+import logging
+import re
+import subprocess
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+
+logger = logging.getLogger(__name__)
+
+DEVEL_SUFFIXES = ('-git', '-svn', '-hg')
+JOBS = 8
+
+
+class VCSSource(namedtuple('VCSSource', 'vcs url fragment')):
+    """A VCS entry of the source array of a PKGBUILD."""
+    def key(self):
+        """Returns a string identifying the source."""
+        key = '{}+{}'.format(self.vcs, self.url)
+        if self.fragment:
+            key += '#' + self.fragment
+        return key
+
+    def options(self):
+        """Returns the fragment (like branch=stable) as a dict."""
+        return dict(option.partition('=')[::2]
+                    for option in self.fragment.split('&') if option)
+
+
+def parse_source(source):
+    """Returns a VCSSource for the given entry of a PKGBUILD source array,
+    or None if it does not come from a VCS."""
+    if '::' in source:
+        source = source.split('::', 1)[1]
+    url, _, fragment = source.partition('#')
+    scheme, sep, _ = url.partition('://')
+    if not sep:
+        return None
+    vcs = scheme.split('+')[0]
+    if vcs not in _PROBES:
+        return None
+    if '+' in scheme:
+        url = url[len(vcs) + 1:]
+    # makepkg puts the query after the fragment, like #tag=v1?signed, but
+    # we also accept it before
+    url = url.split('?')[0]
+    fragment = fragment.split('?')[0]
+    return VCSSource(vcs, url, fragment)
+
+
+def _probe_git(source):
+    options = source.options()
+    if 'commit' in options:
+        return options['commit']
+    if 'branch' in options:
+        ref = 'refs/heads/' + options['branch']
+    elif 'tag' in options:
+        ref = 'refs/tags/' + options['tag']
+    else:
+        ref = 'HEAD'
+    output = subprocess.check_output(['git', 'ls-remote', source.url, ref],
+                                     stderr=subprocess.DEVNULL)
+    lines = output.decode().split()
+    return lines[0] if lines else None
+
+
+def _probe_svn(source):
+    options = source.options()
+    if 'revision' in options:
+        return options['revision']
+    output = subprocess.check_output(['svn', 'info', '--non-interactive',
+                                      source.url],
+                                     stderr=subprocess.DEVNULL)
+    match = re.search(r'^Last Changed Rev: (\d+)$', output.decode(), re.M)
+    return match.group(1) if match else None
+
+
+def _probe_hg(source):
+    options = source.options()
+    revision = (options.get('revision') or options.get('tag') or
+                options.get('branch') or 'default')
+    output = subprocess.check_output(['hg', 'identify', '--id',
+                                      '--rev', revision, source.url],
+                                     stderr=subprocess.DEVNULL)
+    return output.decode().strip() or None
+
+
+_PROBES = {'git': _probe_git, 'svn': _probe_svn, 'hg': _probe_hg}
+
+
+def probe(source):
+    """Returns the current upstream revision of the source, or None if it
+    can't be found."""
+    try:
+        return _PROBES[source.vcs](source)
+    except (subprocess.CalledProcessError, OSError) as e:
+        logger.warning('Could not probe %s: %s', source.key(), e)
+        return None
+
+
+def probe_all(sources, jobs=JOBS):
+    """Probes the sources concurrently, and returns a dict mapping each of
+    them to its revision."""
+    sources = list(set(sources))
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        return dict(zip(sources, executor.map(probe, sources)))
+
+
+def probe_packages(packages, jobs=JOBS):
+    """Probes the VCS sources of all the packages concurrently, and stores
+    the result in their vcs_heads attribute."""
+    sources = {pkg: pkg.vcs_sources() for pkg in packages}
+    revisions = probe_all([s for pkg_sources in sources.values()
+                           for s in pkg_sources], jobs)
+    for pkg, pkg_sources in sources.items():
+        pkg.vcs_heads = {s.key(): revisions[s] for s in pkg_sources
+                         if revisions[s]}
+
+
+def outdated_packages(packages, jobs=JOBS):
+    """Returns the packages whose VCS sources moved since they were last
+    built."""
+    probe_packages(packages, jobs)
+    return [pkg for pkg in packages if pkg.vcs_outdated()]
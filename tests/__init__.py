@@ -0,0 +1,26 @@
+import io
+import tarfile
+
+
+DESC = """%FILENAME%
+{filename}
+
+%NAME%
+{name}
+
+%VERSION%
+{version}
+
+"""
+
+
+def write_repository_db(db_path, packages):
+    """Writes a pacman repository database, like repo-add would, holding the
+    given (name, version, filename) packages."""
+    with tarfile.open(db_path, 'w:gz') as db:
+        for name, version, filename in packages:
+            data = DESC.format(filename=filename, name=name,
+                               version=version).encode()
+            info = tarfile.TarInfo('{}-{}/desc'.format(name, version))
+            info.size = len(data)
+            db.addfile(info, io.BytesIO(data))
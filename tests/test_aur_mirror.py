@@ -0,0 +1,105 @@
+import gzip
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+
+PEP8 = {'Name': 'pep8', 'PackageBase': 'pep8', 'Version': '0.6.1-3',
+        'URLPath': '/cgit/aur.git/snapshot/pep8.tar.gz',
+        'Depends': ['python2'], 'Provides': ['python2-pep8=0.6.1']}
+YAOURT = {'Name': 'yaourt', 'PackageBase': 'yaourt', 'Version': '1.2-1',
+          'URLPath': '/cgit/aur.git/snapshot/yaourt.tar.gz',
+          'Depends': ['package-query']}
+PACKAGE_QUERY = {'Name': 'package-query', 'PackageBase': 'package-query',
+                 'Version': '1.1-1',
+                 'URLPath': '/cgit/aur.git/snapshot/package-query.tar.gz'}
+
+
+class AurMirrorTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        from aurifere.providers.aur_mirror import AurMirror
+        self.mirror = AurMirror(os.path.join(self.dir.name, 'mirror.sqlite'))
+
+    def tearDown(self):
+        self.mirror.close()
+        self.dir.cleanup()
+
+    def _dump(self, packages):
+        path = os.path.join(self.dir.name, 'packages-meta-ext-v1.json.gz')
+        with gzip.open(path, 'wt') as f:
+            json.dump(packages, f)
+        return path
+
+    def test_info(self):
+        self.mirror.import_dump(self._dump([PEP8, YAOURT]))
+        self.assertEqual(self.mirror.info('pep8'), [PEP8])
+        self.assertEqual(self.mirror.info(['yaourt', 'missing']), [YAOURT])
+        self.assertEqual(self.mirror.info('missing'), [])
+
+    def test_providers(self):
+        self.mirror.import_dump(self._dump([PEP8, YAOURT]))
+        self.assertEqual(self.mirror.providers('python2-pep8'), ['pep8'])
+        self.assertEqual(self.mirror.providers('python-pep8'), [])
+
+    def test_refresh(self):
+        self.assertEqual(self.mirror.import_dump(self._dump([PEP8, YAOURT])),
+                         (2, 0, 0))
+        pep8 = dict(PEP8, Version='0.6.2-1', Provides=[])
+        self.assertEqual(
+            self.mirror.import_dump(self._dump([pep8, PACKAGE_QUERY])),
+            (1, 1, 1))
+        self.assertEqual(self.mirror.info('pep8'), [pep8])
+        self.assertEqual(self.mirror.info('yaourt'), [])
+        self.assertEqual(self.mirror.providers('python2-pep8'), [])
+        self.assertEqual(len(self.mirror), 2)
+
+
+class MirrorBackedAurTest(unittest.TestCase):
+    """The AUR queries answered by the mirror, once a dump is imported."""
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        from aurifere.providers import aur
+        from aurifere.providers.aur_mirror import AurMirror
+        self.aur = aur
+        self.path = os.path.join(self.dir.name, 'mirror.sqlite')
+        self.mirror = AurMirror(self.path)
+        for patch in (mock.patch.object(aur, 'MIRROR_FILENAME', self.path),
+                      mock.patch.object(aur, '_aur_mirror', None),
+                      mock.patch.object(aur, 'get_satisfier_in_syncdb',
+                                        return_value=None)):
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def tearDown(self):
+        if self.aur._aur_mirror:
+            self.aur._aur_mirror.close()
+        self.mirror.close()
+        self.dir.cleanup()
+
+    def _import(self, packages):
+        path = os.path.join(self.dir.name, 'packages-meta-ext-v1.json')
+        with open(path, 'w') as f:
+            json.dump(packages, f)
+        self.mirror.import_dump(path)
+
+    def test_empty_mirror_is_not_used(self):
+        self.assertIsNone(self.aur.aur_mirror())
+        self.assertIsNone(self.aur.aur_provider('python2-pep8'))
+
+    def test_aur_info(self):
+        self._import([PEP8, YAOURT])
+        self.assertEqual(self.aur.aur_info('pep8'), [PEP8])
+        self.assertEqual(self.aur.aur_info(['missing']), [])
+
+    def test_aur_provider(self):
+        self._import([PEP8, YAOURT])
+        self.assertEqual(self.aur.aur_provider('python2-pep8'), 'pep8')
+        self.assertIsNone(self.aur.aur_provider('python-pep8'))
+
+    def test_aur_provider_prefers_sync_packages(self):
+        self._import([PEP8, YAOURT])
+        self.aur.get_satisfier_in_syncdb.return_value = 'python2-pep8'
+        self.assertIsNone(self.aur.aur_provider('python2-pep8'))
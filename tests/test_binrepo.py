@@ -0,0 +1,37 @@
+import os
+import tempfile
+import unittest
+from . import write_repository_db
+
+
+class BinaryRepositoryTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def _get_repository(self):
+        from aurifere.binrepo import BinaryRepository
+        return BinaryRepository(self.dir.name)
+
+    def _write_db(self, packages):
+        write_repository_db(
+            os.path.join(self.dir.name, 'aurifere.db.tar.gz'),
+            [(name, version, '{}-{}-x86_64.pkg.tar.xz'.format(name, version))
+             for name, version in packages])
+
+    def test_empty_repository(self):
+        self.assertIsNone(self._get_repository().version('pep8'))
+
+    def test_version(self):
+        self._write_db([('pep8', '0.6.1-3'), ('aurifere-git', '1:20130101-1')])
+        repository = self._get_repository()
+        self.assertEqual(repository.version('pep8'), '0.6.1-3')
+        self.assertEqual(repository.version('aurifere-git'), '1:20130101-1')
+        self.assertIsNone(repository.version('yaourt'))
+
+    def test_files(self):
+        self._write_db([('pep8', '0.6.1-3')])
+        self.assertEqual(self._get_repository().files(['pep8']),
+            [os.path.join(self.dir.name, 'pep8-0.6.1-3-x86_64.pkg.tar.xz')])
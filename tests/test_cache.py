@@ -0,0 +1,35 @@
+import os
+import tempfile
+import unittest
+from aurifere.cache import Cache
+
+
+class CacheTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'cache.sqlite')
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_get_and_set(self):
+        cache = Cache(self.path)
+        cache['pep8'] = {'depends': ['python2'], 'epoch': None}
+        self.assertEqual(cache['pep8'], {'depends': ['python2'], 'epoch': None})
+        self.assertIn('pep8', cache)
+        self.assertIsNone(cache.get('yaourt'))
+        with self.assertRaises(KeyError):
+            cache['yaourt']
+
+    def test_delete(self):
+        cache = Cache(self.path)
+        cache.update(pep8='aur', yaourt='manual')
+        del cache['pep8']
+        self.assertEqual(dict(cache), {'yaourt': 'manual'})
+
+    def test_writes_are_shared(self):
+        first, second = Cache(self.path), Cache(self.path)
+        first['pep8'] = 'aur'
+        second['yaourt'] = 'manual'
+        self.assertEqual(dict(first), {'pep8': 'aur', 'yaourt': 'manual'})
+        self.assertEqual(len(second), 2)
@@ -0,0 +1,53 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+from aurifere.git import Git
+
+
+class GitTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        environ = mock.patch.dict(os.environ, GIT_AUTHOR_NAME='test',
+                                  GIT_AUTHOR_EMAIL='test@example.com',
+                                  GIT_COMMITTER_NAME='test',
+                                  GIT_COMMITTER_EMAIL='test@example.com')
+        environ.start()
+        self.addCleanup(environ.stop)
+        self.git = Git(os.path.join(self.dir.name, 'repo'))
+        self.git.init()
+        self.git._git('branch', 'upstream')
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def _snapshot(self, files):
+        snapshot = tempfile.mkdtemp(dir=self.dir.name)
+        for name, content in files.items():
+            with open(os.path.join(snapshot, name), 'w') as f:
+                f.write(content)
+        return snapshot
+
+    def test_commit_dir_leaves_working_tree_alone(self):
+        self.git.commit_dir('upstream',
+                            self._snapshot({'PKGBUILD': 'pkgver=1\n'}), '1-1')
+        self.assertEqual(os.listdir(self.git.dir), ['.git'])
+        self.assertEqual(self.git.status(untracked_files='all'), '')
+        self.assertIsNone(self.git.blob('master', 'PKGBUILD'))
+
+    def test_read_blob(self):
+        self.git.commit_dir('upstream',
+                            self._snapshot({'PKGBUILD': 'pkgver=1\n'}), '1-1')
+        self.git.commit_dir('upstream',
+                            self._snapshot({'PKGBUILD': 'pkgver=2\n'}), '2-1')
+        blob = self.git.blob('upstream', 'PKGBUILD')
+        self.assertEqual(self.git.read_blob(blob), b'pkgver=2\n')
+        blob = self.git.blob('upstream~1', 'PKGBUILD')
+        self.assertEqual(self.git.read_blob(blob), b'pkgver=1\n')
+
+    def test_commit_dir_removes_files(self):
+        self.git.commit_dir('upstream', self._snapshot(
+            {'PKGBUILD': 'pkgver=1\n', 'fix.patch': ''}), '1-1')
+        self.git.commit_dir('upstream',
+                            self._snapshot({'PKGBUILD': 'pkgver=2\n'}), '2-1')
+        self.assertIsNone(self.git.blob('upstream', 'fix.patch'))
@@ -0,0 +1,218 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+from . import write_repository_db
+
+
+def _fake_repo_add(repository, files):
+    """Writes the database of the repository as repo-add would."""
+    packages = []
+    for filename in sorted(os.listdir(repository.dir)):
+        if '.pkg.tar' not in filename:
+            continue
+        name, version, release, _ = (filename.split('.pkg.tar')[0]
+                                     .rsplit('-', 3))
+        packages.append((name, version + '-' + release, filename))
+    write_repository_db(repository.db_path, packages)
+    repository._index = None
+
+
+class FakePackage:
+    """Package building files named after its pkgnames and version."""
+    def __init__(self, name, version, pkgnames=None, vcs_heads=None,
+                 depends=()):
+        self.name = name
+        self._version = version
+        self._pkgnames = pkgnames or [name]
+        self.vcs_heads = vcs_heads
+        self.depends = list(depends)
+        self.recorded_vcs_heads = None
+        self.builds = 0
+
+    def is_devel(self):
+        return self.vcs_heads is not None
+
+    def record_vcs_revisions(self):
+        self.recorded_vcs_heads = self.vcs_heads
+
+    def version(self):
+        return self._version
+
+    def pkgbuild(self):
+        return mock.Mock(**{'all_depends.return_value': self.depends})
+
+    def pkgnames(self):
+        return self._pkgnames
+
+    def review_needed(self):
+        return False
+
+    def build(self, pkgdest):
+        self.builds += 1
+        files = []
+        for name in self._pkgnames:
+            path = os.path.join(pkgdest, '{}-{}-any.pkg.tar.xz'.format(
+                name, self._version))
+            open(path, 'w').close()
+            files.append(path)
+        return files
+
+
+class BinaryRepositoryBuildTest(unittest.TestCase):
+    def setUp(self):
+        from aurifere.binrepo import BinaryRepository
+        from aurifere.install import Install
+        self.dir = tempfile.TemporaryDirectory()
+        self.repository = BinaryRepository(self.dir.name)
+        self.installer = Install(None, self.repository)
+        repo_add = mock.patch.object(BinaryRepository, 'add', autospec=True,
+                                     side_effect=_fake_repo_add)
+        repo_add.start()
+        self.addCleanup(repo_add.stop)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_build_into_repository(self):
+        pkg = FakePackage('pep8', '0.6.1-3')
+        files = self.installer._build(pkg)
+        self.assertEqual(pkg.builds, 1)
+        self.assertEqual(files, [os.path.join(self.repository.dir,
+                                              'pep8-0.6.1-3-any.pkg.tar.xz')])
+        self.assertEqual(self.repository.version('pep8'), '0.6.1-3')
+
+    def test_skip_build_of_reviewed_version(self):
+        self.installer._build(FakePackage('pep8', '0.6.1-3'))
+        pkg = FakePackage('pep8', '0.6.1-3')
+        files = self.installer._build(pkg)
+        self.assertEqual(pkg.builds, 0)
+        self.assertEqual(files, [os.path.join(self.repository.dir,
+                                              'pep8-0.6.1-3-any.pkg.tar.xz')])
+
+    def test_devel_package_is_always_built(self):
+        heads = {'git+file:///foo': 'abc'}
+        self.installer._build(FakePackage('foo-git', '1-1', vcs_heads={}))
+        pkg = FakePackage('foo-git', '1-1', vcs_heads=heads)
+        self.installer._build(pkg)
+        self.assertEqual(pkg.builds, 1)
+        self.assertEqual(pkg.recorded_vcs_heads, heads)
+
+    def test_build_new_version(self):
+        self.installer._build(FakePackage('pep8', '0.6.1-3'))
+        pkg = FakePackage('pep8', '0.6.2-1')
+        self.installer._build(pkg)
+        self.assertEqual(pkg.builds, 1)
+        self.assertEqual(self.repository.version('pep8'), '0.6.2-1')
+
+
+class FakeRepository:
+    def __init__(self, *packages):
+        # Split packages are found under all their names
+        self.packages = {name: pkg for pkg in packages
+                         for name in pkg.pkgnames()}
+
+    def package(self, name):
+        from aurifere.repository import PackageNotInRepositoryException
+        try:
+            return self.packages[name]
+        except KeyError:
+            raise PackageNotInRepositoryException(name)
+
+
+class FindPackageTest(unittest.TestCase):
+    def setUp(self):
+        from aurifere.install import Install
+        self.pep8 = FakePackage('pep8', '0.6.1-3')
+        self.installer = Install(FakeRepository(self.pep8))
+        self.providers = {'python2-pep8': 'pep8'}
+        self.installed = set()
+        for patch in (mock.patch('aurifere.install.aur_provider',
+                                 side_effect=self.providers.get),
+                      mock.patch('aurifere.install.installed',
+                                 side_effect=self.installed.__contains__)):
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_package(self):
+        self.assertEqual(self.installer._find_package('pep8'),
+                         (self.pep8, 'pep8'))
+
+    def test_aur_provider(self):
+        self.assertEqual(self.installer._find_package('python2-pep8'),
+                         (self.pep8, 'pep8'))
+
+    def test_installed_dependency_is_not_provided(self):
+        from aurifere.repository import PackageNotInRepositoryException
+        self.installed.add('python2-pep8')
+        with self.assertRaises(PackageNotInRepositoryException):
+            self.installer._find_package('python2-pep8')
+
+    def test_unknown_dependency(self):
+        from aurifere.repository import PackageNotInRepositoryException
+        with self.assertRaises(PackageNotInRepositoryException):
+            self.installer._find_package('python2')
+
+
+class NameSelectionTest(unittest.TestCase):
+    """The split packages to install from each package."""
+    def setUp(self):
+        from aurifere.install import Install
+        self.prettytable = FakePackage(
+            'python-prettytable', '0.7.2-1',
+            pkgnames=['python-prettytable', 'python2-prettytable'],
+            depends=['python2-prettytable'])
+        self.installer = Install(FakeRepository(self.prettytable))
+        self.installed = set()
+        for patch in (mock.patch('aurifere.install.aur_provider',
+                                 return_value=None),
+                      mock.patch('aurifere.install.installed',
+                                 side_effect=self.installed.__contains__)):
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.files = ['/tmp/python-prettytable-0.7.2-1-any.pkg.tar.xz',
+                      '/tmp/python2-prettytable-0.7.2-1-any.pkg.tar.xz']
+
+    def test_requested_names(self):
+        self.installer.add_package(self.prettytable, force=True,
+                                   pkgname='python-prettytable')
+        self.assertEqual(self.installer.to_install, [self.prettytable])
+        # The sibling it depends on is built along with it
+        self.assertEqual(self.installer._outputs(self.prettytable),
+                         ['python-prettytable', 'python2-prettytable'])
+
+    def test_installed_siblings_are_kept_in_sync(self):
+        self.prettytable.depends = []
+        self.installed.add('python2-prettytable')
+        self.installer.add_package(self.prettytable, force=True,
+                                   pkgname='python-prettytable')
+        self.assertEqual(self.installer._outputs(self.prettytable),
+                         ['python-prettytable', 'python2-prettytable'])
+
+    def test_other_siblings_are_not_installed(self):
+        self.prettytable.depends = []
+        self.installer.add_package(self.prettytable, force=True,
+                                   pkgname='python2-prettytable')
+        self.assertEqual(self.installer._outputs(self.prettytable),
+                         ['python2-prettytable'])
+
+    def test_select_files(self):
+        self.assertEqual(
+            self.installer._select_files(self.files, ['python2-prettytable']),
+            self.files[1:])
+
+    def test_select_missing_files(self):
+        from aurifere.install import MissingPackageFilesException
+        with self.assertRaises(MissingPackageFilesException):
+            self.installer._select_files(self.files[:1],
+                                         ['python2-prettytable'])
+
+
+class PackageBuildTest(unittest.TestCase):
+    def test_build_overwrites_existing_package(self):
+        from aurifere.package import Package
+        pkg = Package.__new__(Package)
+        with tempfile.TemporaryDirectory() as pkgdest, \
+                mock.patch.object(Package, '_makepkg') as makepkg:
+            pkg.build(pkgdest)
+        self.assertIn('--force', makepkg.call_args[0])
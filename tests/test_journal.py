@@ -0,0 +1,161 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+
+class FakeGit:
+    def __init__(self, commit):
+        self.commit = commit
+
+    def ref(self, ref):
+        return self.commit
+
+
+class FakePackage:
+    def __init__(self, name, commit='1234'):
+        self.name = name
+        self._git = FakeGit(commit)
+        self.vcs_heads = None
+        self.builds = 0
+
+    def is_devel(self):
+        return False
+
+    def record_vcs_revisions(self):
+        pass
+
+    def build(self, pkgdest):
+        self.builds += 1
+        path = os.path.join(pkgdest, self.name + '-1.0-1-any.pkg.tar.xz')
+        open(path, 'w').close()
+        return [path]
+
+
+class FakeRepository:
+    def __init__(self, packages):
+        self.packages = {pkg.name: pkg for pkg in packages}
+
+    def existing_package(self, name):
+        return self.packages[name]
+
+
+class JournalTestCase(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        journal_dir = mock.patch('aurifere.journal.JOURNAL_DIR',
+                                 self.dir.name)
+        journal_dir.start()
+        self.addCleanup(journal_dir.stop)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def _create(self, packages, dependencies=()):
+        from aurifere.journal import Journal
+        return Journal.create(packages,
+                              {pkg.name: [pkg.name] for pkg in packages},
+                              dependencies)
+
+    def _release(self, journal):
+        """Simulates the end of the process running the journal."""
+        journal.lock.release()
+
+
+class JournalTest(JournalTestCase):
+    def test_status_transitions(self):
+        from aurifere.journal import Journal, PENDING, BUILT, INSTALLED
+        journal = self._create([FakePackage('pep8')])
+        self.assertEqual(journal.status('pep8'), PENDING)
+        self.assertIsNone(journal.files('pep8'))
+        journal.built('pep8', [journal.path])
+        journal.installed('pep8')
+        self._release(journal)
+
+        journal = Journal.latest()
+        self.assertEqual(journal.status('pep8'), INSTALLED)
+        self.assertEqual(journal.files('pep8'), [journal.path])
+        self.assertEqual(journal.pkgnames('pep8'), ['pep8'])
+        self.assertEqual(journal.commit('pep8'), '1234')
+
+    def test_built_files_must_exist(self):
+        journal = self._create([FakePackage('pep8')])
+        journal.built('pep8', [os.path.join(self.dir.name, 'missing')])
+        self.assertIsNone(journal.files('pep8'))
+
+    def test_finish(self):
+        from aurifere.journal import Journal
+        journal = self._create([FakePackage('pep8')])
+        journal.finish()
+        self.assertEqual(os.listdir(self.dir.name), [])
+        self.assertIsNone(Journal.latest())
+
+    def test_running_journal_is_skipped(self):
+        from aurifere.journal import Journal
+        running = self._create([FakePackage('pep8')])
+        self.assertIsNone(Journal.latest())
+        self._release(running)
+        self.assertEqual(Journal.latest().path, running.path)
+
+    def test_new_run_supersedes_interrupted_ones(self):
+        from aurifere.journal import Journal
+        old = self._create([FakePackage('pep8')])
+        self._release(old)
+        new = self._create([FakePackage('yaourt')])
+        self.assertFalse(os.path.exists(old.path))
+        self._release(new)
+        self.assertEqual(Journal.latest().plan, ['yaourt'])
+
+    def test_new_run_keeps_running_ones(self):
+        running = self._create([FakePackage('pep8')])
+        new = self._create([FakePackage('yaourt')])
+        self.assertTrue(os.path.exists(running.path))
+        self.assertTrue(os.path.exists(new.path))
+
+
+@mock.patch('aurifere.install.mark_as_dependencies')
+@mock.patch('aurifere.install.install_files')
+class ResumeTest(JournalTestCase):
+    def _resume(self, packages):
+        from aurifere.install import Install
+        from aurifere.journal import Journal
+        return Install.from_journal(FakeRepository(packages),
+                                    Journal.latest())
+
+    def test_commit_mismatch(self, install_files, mark_as_dependencies):
+        from aurifere.journal import JournalMismatchException
+        self._release(self._create([FakePackage('pep8')]))
+        with self.assertRaises(JournalMismatchException):
+            self._resume([FakePackage('pep8', commit='5678')])
+
+    def test_reuse_built_packages(self, install_files, mark_as_dependencies):
+        from aurifere.journal import INSTALLED
+        pep8, yaourt = FakePackage('pep8'), FakePackage('yaourt')
+        journal = self._create([pep8, yaourt], dependencies=['pep8'])
+        journal.built('pep8', pep8.build(journal.artifacts_dir))
+        journal.installed('pep8')
+        journal.built('yaourt', yaourt.build(journal.artifacts_dir))
+        self._release(journal)
+
+        pep8, yaourt = FakePackage('pep8'), FakePackage('yaourt')
+        installer = self._resume([pep8, yaourt])
+        self.assertEqual(installer.to_install, [pep8, yaourt])
+        installer.install()
+        self.assertEqual((pep8.builds, yaourt.builds), (0, 0))
+        install_files.assert_called_once_with(
+            [os.path.join(installer.journal.artifacts_dir,
+                          'yaourt-1.0-1-any.pkg.tar.xz')])
+        mark_as_dependencies.assert_called_once_with(['pep8'])
+        self.assertEqual(os.listdir(self.dir.name), [])
+
+    def test_rebuild_missing_packages(self, install_files,
+                                      mark_as_dependencies):
+        pep8 = FakePackage('pep8')
+        journal = self._create([pep8])
+        journal.built('pep8', [os.path.join(self.dir.name, 'missing')])
+        self._release(journal)
+
+        pep8 = FakePackage('pep8')
+        self._resume([pep8]).install()
+        self.assertEqual(pep8.builds, 1)
+        self.assertEqual(install_files.call_count, 1)
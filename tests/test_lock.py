@@ -0,0 +1,58 @@
+import multiprocessing
+import os
+import tempfile
+import unittest
+from aurifere.lock import FileLock
+
+
+# Forked processes would inherit the file descriptors holding the locks of
+# the test, so the other processes are started from scratch
+_context = multiprocessing.get_context('spawn')
+
+def _take_lock(path, blocking, acquired):
+    """Takes the lock in another process, and tells if it succeeded."""
+    acquired.put(FileLock(path).acquire(blocking=blocking))
+
+
+class FileLockTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'pep8.lock')
+        self.acquired = _context.Queue()
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def _start(self, path, blocking=True):
+        process = _context.Process(
+            target=_take_lock, args=(path, blocking, self.acquired))
+        process.start()
+        self.addCleanup(process.join, 5)
+        return process
+
+    def _available_to_others(self, path):
+        self._start(path, blocking=False).join(5)
+        return self.acquired.get(timeout=5)
+
+    def test_other_process_waits(self):
+        with FileLock(self.path):
+            process = self._start(self.path)
+            process.join(2)
+            self.assertTrue(process.is_alive())
+        process.join(5)
+        self.assertFalse(process.is_alive())
+        self.assertTrue(self.acquired.get(timeout=5))
+
+    def test_other_package_does_not_wait(self):
+        with FileLock(self.path):
+            other = os.path.join(self.dir.name, 'yaourt.lock')
+            self.assertTrue(self._available_to_others(other))
+            self.assertFalse(self._available_to_others(self.path))
+
+    def test_reentrant(self):
+        lock = FileLock(self.path)
+        with lock:
+            with lock:
+                self.assertFalse(self._available_to_others(self.path))
+            self.assertFalse(self._available_to_others(self.path))
+        self.assertTrue(self._available_to_others(self.path))
@@ -0,0 +1,75 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+from aurifere.lock import FileLock
+from aurifere.package import Package
+
+
+class FakeProvider:
+    """Upstream serving the PKGBUILD of the given version."""
+    def __init__(self, name, dir):
+        self.pkgver = '1'
+
+    def upstream_version(self):
+        return self.pkgver + '-1'
+
+    def fetch_upstream(self, dir):
+        with open(os.path.join(dir, 'PKGBUILD'), 'w') as f:
+            f.write('pkgname=pep8\npkgver={}\npkgrel=1\n'
+                    'depends=(python)\n'.format(self.pkgver))
+
+
+class FakeRepository:
+    def __init__(self, dir):
+        self.dir = dir
+        self.locks_dir = os.path.join(dir, '.locks')
+        os.makedirs(self.locks_dir)
+
+
+class PackageTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        environ = mock.patch.dict(os.environ, GIT_AUTHOR_NAME='test',
+                                  GIT_AUTHOR_EMAIL='test@example.com',
+                                  GIT_COMMITTER_NAME='test',
+                                  GIT_COMMITTER_EMAIL='test@example.com')
+        environ.start()
+        self.addCleanup(environ.stop)
+        self.repository = FakeRepository(self.dir.name)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def _package(self):
+        return Package('pep8', self.repository, FakeProvider)
+
+    def _update(self, package, pkgver):
+        package.provider.pkgver = pkgver
+        package.update_from_upstream()
+        package.apply_modifications()
+
+    def test_validate_review_tags_the_reviewed_commit(self):
+        package = self._package()
+        reviewed = package._git.ref('master')
+        package.validate_review(reviewed)
+        self.assertFalse(package.review_needed())
+
+        self._update(package, '2')
+        diffed = package._git.ref('master')
+        # Fetched by another process while the diff was shown
+        self._update(package, '3')
+        package.validate_review(diffed)
+
+        self.assertEqual(package._git.ref('reviewed'), diffed)
+        self.assertNotEqual(package._git.ref('master'), diffed)
+
+    def test_opening_locked_package_does_not_wait(self):
+        self._package()
+        with FileLock(os.path.join(self.repository.locks_dir, 'pep8.lock')):
+            # A build in progress modifies the working tree
+            with open(os.path.join(self.dir.name, 'pep8', 'PKGBUILD'),
+                      'a') as f:
+                f.write('# building\n')
+            package = self._package()
+        self.assertEqual(package.version(), '1-1')
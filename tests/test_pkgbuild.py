@@ -23,6 +23,25 @@ class PkgbuildTest(unittest.TestCase):
         self.assertEqual(list(p.all_depends()),
             ['python2', 'setuptools', 'fakedepend'])
 
+    def test_names(self):
+        p = self._get_pkgbuild()
+        self.assertEqual(p.names(), ['pep8'])
+        self.assertEqual(p.base(), 'pep8')
+
+    def test_split_package_names(self):
+        from aurifere.pkgbuild import PKGBUILD
+        p = PKGBUILD(os.path.join(here, 'fixtures/PKGBUILD-split'))
+        self.assertEqual(p.names(),
+            ['python-prettytable', 'python2-prettytable'])
+        self.assertEqual(p.base(), 'python-prettytable')
+
+    def test_from_content(self):
+        from aurifere.pkgbuild import PKGBUILD
+        with open(os.path.join(here, 'fixtures/PKGBUILD'), 'rb') as f:
+            p = PKGBUILD.from_content(f.read())
+        self.assertEqual(p['name'], 'pep8')
+        self.assertEqual(p.version(), '0.6.1-3')
+
 
 class VersionCompareTest(unittest.TestCase):
     def _get_FUT(self):
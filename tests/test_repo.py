@@ -1,9 +1,26 @@
 import os
 import unittest
 import tempfile
+from unittest import mock
 from aurifere.repository import Repository
 
 
+PKGBASES = {'python-prettytable': 'python-prettytable',
+            'python2-prettytable': 'python-prettytable'}
+
+
+class FakePackage:
+    """Package of the python-prettytable pkgbase, or of a single package."""
+    def __init__(self, name, repository, provider_class=None):
+        self.name = name
+        self.dir = os.path.join(repository.dir, name)
+
+    def pkgnames(self):
+        if self.name == 'python-prettytable':
+            return ['python-prettytable', 'python2-prettytable']
+        return [self.name]
+
+
 class RepoTest(unittest.TestCase):
     def setUp(self):
         self.dir = tempfile.TemporaryDirectory()
@@ -21,3 +38,53 @@ class RepoTest(unittest.TestCase):
         package = self.repo.package('aurifere-git')
         self.assertEqual(package.pkgbuild()['name'], 'aurifere-git')
         self.assertEqual(package.version(), package.provider.upstream_version())
+
+
+class PkgbaseTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.repo = Repository(self.dir.name)
+        for patch in (mock.patch('aurifere.repository.aur_pkgbase',
+                                 side_effect=PKGBASES.get),
+                      mock.patch('aurifere.repository.Package', FakePackage)):
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def _old_package(self, name, type='aur'):
+        """Creates a package the way older versions did, named after one of
+        the split packages."""
+        os.mkdir(os.path.join(self.dir.name, name))
+        self.repo.db[name] = type
+
+    def test_split_packages_share_their_pkgbase(self):
+        package = self.repo.package('python2-prettytable')
+        self.assertEqual(package.name, 'python-prettytable')
+        self.assertIs(self.repo.package('python-prettytable'), package)
+        self.assertEqual(dict(self.repo.db), {'python-prettytable': 'aur'})
+
+    def test_package_without_pkgbase(self):
+        self.assertEqual(self.repo.package('pep8').name, 'pep8')
+
+    def test_move_to_pkgbase(self):
+        self._old_package('python2-prettytable')
+        package = self.repo.package('python2-prettytable')
+        self.assertTrue(os.path.isdir(package.dir))
+        self.assertFalse(os.path.exists(
+            os.path.join(self.dir.name, 'python2-prettytable')))
+        self.assertEqual(dict(self.repo.db), {'python-prettytable': 'aur'})
+
+    def test_siblings_are_forgotten(self):
+        self._old_package('python-prettytable')
+        self._old_package('python2-prettytable')
+        with self.assertLogs('aurifere.repository', 'WARNING'):
+            self.repo.package('python2-prettytable')
+        self.assertEqual(dict(self.repo.db), {'python-prettytable': 'aur'})
+
+    def test_manual_package_is_not_grouped(self):
+        self._old_package('python2-prettytable', type='manual')
+        package = self.repo.package('python2-prettytable')
+        self.assertEqual(package.name, 'python2-prettytable')
+        self.assertEqual(self.repo.db['python2-prettytable'], 'manual')
@@ -0,0 +1,135 @@
+import os
+import subprocess
+import tempfile
+import unittest
+from aurifere.vcs import parse_source, probe, probe_packages, VCSSource
+
+
+class ParseSourceTest(unittest.TestCase):
+    def test_not_vcs(self):
+        self.assertIsNone(parse_source('http://example.com/pep8-0.6.1.tar.gz'))
+        self.assertIsNone(parse_source('fix.patch'))
+
+    def test_git(self):
+        self.assertEqual(parse_source('git+https://example.com/foo.git'),
+                         VCSSource('git', 'https://example.com/foo.git', ''))
+
+    def test_git_scheme(self):
+        self.assertEqual(parse_source('git://example.com/foo.git'),
+                         VCSSource('git', 'git://example.com/foo.git', ''))
+
+    def test_name_and_fragment(self):
+        source = parse_source('foo::git+https://example.com/foo.git#branch=dev')
+        self.assertEqual(source,
+                         VCSSource('git', 'https://example.com/foo.git',
+                                   'branch=dev'))
+        self.assertEqual(source.options(), {'branch': 'dev'})
+        self.assertEqual(source.key(),
+                         'git+https://example.com/foo.git#branch=dev')
+
+    def test_signed(self):
+        source = parse_source('git+https://example.com/foo.git#tag=v1?signed')
+        self.assertEqual(source,
+                         VCSSource('git', 'https://example.com/foo.git',
+                                   'tag=v1'))
+        self.assertEqual(source.options(), {'tag': 'v1'})
+        self.assertEqual(parse_source('git+https://example.com/foo.git?signed'),
+                         VCSSource('git', 'https://example.com/foo.git', ''))
+
+    def test_svn(self):
+        self.assertEqual(parse_source('svn+https://example.com/trunk'),
+                         VCSSource('svn', 'https://example.com/trunk', ''))
+
+
+class ProbeGitTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.work = os.path.join(self.dir.name, 'work')
+        self.bare = os.path.join(self.dir.name, 'bare.git')
+        self._git('init', '--quiet', self.work)
+        self._git('init', '--quiet', '--bare', self.bare)
+        self.first = self._commit()
+        self._git('branch', 'stable', cwd=self.work)
+        self.second = self._commit()
+        self._git('push', '--quiet', self.bare, 'HEAD:refs/heads/master',
+                  'stable', cwd=self.work)
+        self._git('symbolic-ref', 'HEAD', 'refs/heads/master', cwd=self.bare)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def _git(self, *args, cwd=None):
+        env = dict(os.environ, GIT_AUTHOR_NAME='test',
+                   GIT_AUTHOR_EMAIL='test@example.com',
+                   GIT_COMMITTER_NAME='test',
+                   GIT_COMMITTER_EMAIL='test@example.com')
+        return subprocess.check_output(('git',) + args, cwd=cwd,
+                                       env=env).decode().strip()
+
+    def _commit(self):
+        self._git('commit', '--quiet', '--allow-empty', '-m', 'commit',
+                  cwd=self.work)
+        return self._git('rev-parse', 'HEAD', cwd=self.work)
+
+    def _source(self, fragment=''):
+        url = 'git+file://' + self.bare
+        return parse_source(url + '#' + fragment if fragment else url)
+
+    def test_head(self):
+        self.assertEqual(probe(self._source()), self.second)
+
+    def test_branch(self):
+        self.assertEqual(probe(self._source('branch=stable')), self.first)
+
+    def test_signed_tag(self):
+        self._git('tag', 'v1', self.first, cwd=self.work)
+        self._git('push', '--quiet', self.bare, 'v1', cwd=self.work)
+        self.assertEqual(probe(self._source('tag=v1?signed')), self.first)
+
+    def test_commit(self):
+        self.assertEqual(probe(self._source('commit=1234')), '1234')
+
+    def test_missing_repository(self):
+        source = parse_source('git+file://' + self.dir.name + '/missing.git')
+        self.assertIsNone(probe(source))
+
+    def test_probe_packages(self):
+        class FakePackage:
+            def vcs_sources(pkg):
+                return [self._source(), self._source('branch=stable')]
+        pkg = FakePackage()
+        probe_packages([pkg])
+        self.assertEqual(pkg.vcs_heads, {
+            self._source().key(): self.second,
+            self._source('branch=stable').key(): self.first,
+        })
+
+
+class VcsOutdatedTest(unittest.TestCase):
+    def _get_package(self, vcs_db, vcs_heads):
+        from aurifere.package import Package
+
+        class FakeRepository:
+            pass
+        pkg = Package.__new__(Package)
+        pkg.name = 'foo-git'
+        pkg._repository = FakeRepository()
+        pkg._repository.vcs_db = vcs_db
+        pkg.vcs_heads = vcs_heads
+        return pkg
+
+    def test_first_probe_is_recorded(self):
+        vcs_db = {}
+        pkg = self._get_package(vcs_db, {'git+file:///foo': 'abc'})
+        self.assertFalse(pkg.vcs_outdated())
+        self.assertEqual(vcs_db, {'foo-git': {'git+file:///foo': 'abc'}})
+
+    def test_head_moved(self):
+        pkg = self._get_package({'foo-git': {'git+file:///foo': 'abc'}},
+                                {'git+file:///foo': 'def'})
+        self.assertTrue(pkg.vcs_outdated())
+
+    def test_head_did_not_move(self):
+        pkg = self._get_package({'foo-git': {'git+file:///foo': 'abc'}},
+                                {'git+file:///foo': 'abc'})
+        self.assertFalse(pkg.vcs_outdated())